@@ -3,14 +3,16 @@
 
 import os
 import sys
-import argparse
 import subprocess
 import shutil
-import time
 import threading
-from re import sub
-from urllib.request import urlopen
+import functools
+import io
+import tempfile
+import shlex
+import re
 from glob import glob
+from concurrent.futures import ThreadPoolExecutor
 
 from paths import HOME, REPO_DIR, CONFIG, OLD_CONFIG, SRC, FIREFOX_DIR, VSCODE_DIR, installed
 
@@ -86,6 +88,9 @@ VARIANTS = { # all of the possible configurations, name: pretty-name
     }
 }
 
+# every part of the theme that can be enabled, name: pretty-name
+PRETTY_NAMES = {part: pretty for parts in VARIANTS['enableable'].values() for part, pretty in parts.items()}
+
 # Supported DE versions
 VERSIONS = {
     'gnome': (42, 43, 44),
@@ -96,6 +101,15 @@ VERSIONS = {
     'budgie': (10.6,)
 }
 
+# Commands to get DE versions, name: (command, regex of what to ignore in output)
+DE_VERSION_CHECKS = {
+    'gnome': (['gnome-shell', '--version'], re.compile(r'\.[0-9]?\n?$|\D')),
+    'cinnamon': (['cinnamon', '--version'], re.compile(r'\.[0-9]\.?[0-9]?[0-9]?\n?$|^Cinnamon ')),
+    'unity': (['unity', '--version'], re.compile(r'\.[0-9]\.[0-9]?\n?$|\D')),
+    'mate': (['mate-session', '--version'], re.compile(r'\.[0-9][0-9]?\.[0-9][0-9]?\n?$|^mate-session ')),
+    'budgie': (['budgie-desktop', '--version'], re.compile(r'Copyright.*\n|\.[0-9]\n|^budgie-desktop'))
+}
+
 DIR_MSG = f'{BLBLUE}Where do you want to {NC}{BLCYAN}install the theme{NC}{BLBLUE}?{NC}'
 SETTINGS_MSG = f'{BLBLUE}Do you want to theme the {NC}{BLCYAN}settings pages{NC}{BLBLUE} in {BLCYAN}Firefox{BLBLUE}?{NC}{BOLD}'
 SYNTAX_MSG = f'{BLBLUE}Do you want to keep the {NC}{BLCYAN}default syntax highlighting{NC}{BLBLUE} in {BLCYAN}VS Code{BLBLUE}?{NC}{BOLD}'
@@ -118,6 +132,108 @@ OLD_THEMES = [
 # anything in dg-yaru or dg-adw-gtk3
 MESON_THEMES = list(VARIANTS['enableable']['dg-yaru'].keys()) + list(VARIANTS['enableable']['dg-adw-gtk3'].keys())
 
+# Where each theme is set in each desktop
+SCHEMAS = {
+    'gnome': 'org.gnome.desktop.interface',
+    'cinnamon': 'org.cinnamon.desktop.interface',
+    'unity': 'org.gnome.desktop.interface',
+    'mate': 'org.mate.interface',
+    'budgie': 'org.gnome.desktop.interface'
+}
+
+CURSOR_SCHEMAS = {**SCHEMAS, 'mate': 'org.mate.peripherals-mouse'}
+
+SOUND_SCHEMAS = {
+    'gnome': 'org.gnome.desktop.sound',
+    'cinnamon': 'org.cinnamon.desktop.sound',
+    'unity': 'org.gnome.desktop.sound',
+    'mate': 'org.mate.sound',
+    'budgie': 'org.gnome.desktop.sound'
+}
+
+GTKSOURCEVIEW_SCHEMAS = {
+    'Text Editor': 'org.gnome.TextEditor',
+    'Gedit': 'org.gnome.gedit.preferences.editor',
+    'Builder': 'org.gnome.builder.editor',
+    'mousepad': 'org.xfce.mousepad.preferences.view',
+    'pluma': 'org.mate.pluma'
+}
+
+GTKSOURCEVIEW_KEYS = {
+    'Text Editor': 'style-scheme',
+    'Gedit': 'scheme',
+    'Builder': 'style-scheme-name',
+    'mousepad': 'color-scheme',
+    'pluma': 'color-scheme'
+}
+
+THEME_DATA = { # theme: how to enable it, Enable adds the theme name
+    'gtk3': {
+        'schemas': SCHEMAS,
+        'key': 'gtk-theme',
+        'property': '/Net/ThemeName',
+        'channel': 'xsettings'
+    },
+    'icons': {
+        'schemas': SCHEMAS,
+        'key': 'icon-theme',
+        'property': '/Net/IconThemeName',
+        'channel': 'xsettings'
+    },
+    'cursors': {
+        'schemas': CURSOR_SCHEMAS,
+        'key': 'cursor-theme',
+        'property': '/Gtk/CursorThemeName',
+        'channel': 'xsettings'
+    },
+    'sounds': {
+        'schemas': SOUND_SCHEMAS,
+        'key': 'theme-name',
+        'property': '/Net/SoundThemeName',
+        'channel': 'xsettings'
+    },
+    'gnome-shell': {
+        'schemas': {'gnome': 'org.gnome.shell.extensions.user-theme'},
+        'key': 'name',
+        'property': None,
+        'channel': None
+    },
+    'cinnamon-shell': {
+        'schemas': {'cinnamon': 'org.cinnamon.theme'},
+        'key': 'name',
+        'property': None,
+        'channel': None
+    },
+    'metacity': {
+        'schemas': {'mate': 'org.mate.Marco.general'},
+        'key': 'theme',
+        'property': None,
+        'channel': None
+    },
+    'xfwm4': {
+        'schemas': {},
+        'key': None,
+        'property': '/general/theme',
+        'channel': 'xfwm4'
+    },
+    'gtksourceview': {
+        'schemas': GTKSOURCEVIEW_SCHEMAS,
+        'key': GTKSOURCEVIEW_KEYS,
+        'property': None,
+        'channel': None
+    }
+}
+
+# Held by whatever is writing to the terminal, since the themes are installed at the same time
+OUTPUT_LOCK = threading.Lock()
+
+# Commands that are running, so they can be stopped if another one fails
+PROCESSES = set()
+PROCESSES_LOCK = threading.Lock()
+
+# Held while saving the version of a finished install
+CONFIG_LOCK = threading.Lock()
+
 # Set some things to false
 reinstall = no_update = update_color = update_theme = update_settings = update_syntax = reconfigure = verbose = force = configured = updated = False
 
@@ -125,18 +241,7 @@ reinstall = no_update = update_color = update_theme = update_settings = update_s
 ##  Functions  ##
 #################
 
-def cd(directory):
-    '''
-    Change directory.
-
-    Parameters:
-        dir (str) : The path of the directory to change to.
-    '''
-    if verbose:
-        print(f"Changing directory to '{directory}'")
-    os.chdir(directory)
-
-def run_command(command, meson = False, override_verbose = None, show_ouput = False):
+def run_command(command, meson = False, override_verbose = None, show_ouput = False, cwd = None):
     '''
     Run an external command and handle errors.
 
@@ -145,18 +250,34 @@ def run_command(command, meson = False, override_verbose = None, show_ouput = Fa
         meson (bool) : If the option to clean build dir should be printed.
         override_verbose (bool) : Override the global verbose value.
         show_ouput (bool) : Show output of command.
+        cwd (str) : The directory to run the command in. Defaults to None.
     '''
     if override_verbose is None:
         global verbose
     else:
         verbose = override_verbose
     if verbose:
-        print("Running command '" + ' '.join(command) + "'")
+        print("Running command '" + ' '.join(command) + "'" + (f" in '{cwd}'" if cwd is not None else ''))
+    # Send hidden output to a file instead of a pipe, so it is only read back if the command fails
+    log = None if verbose or show_ouput else tempfile.TemporaryFile()
+    if show_ouput:
+        OUTPUT_LOCK.acquire()
     try:
-        subprocess.run(command, stdout=None if verbose or show_ouput else subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
-    except subprocess.CalledProcessError as error:
-        if not (verbose or show_ouput):
-            print('\n' + error.output.decode("utf-8"))
+        with PROCESSES_LOCK:
+            process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, cwd=cwd)
+            PROCESSES.add(process)
+        returncode = process.wait()
+        PROCESSES_LOCK.acquire()
+        PROCESSES.discard(process)
+        if returncode == 0:
+            PROCESSES_LOCK.release()
+            return
+        # Keep the lock so nothing else starts, and stop the commands of the other installs before exiting
+        for other in PROCESSES:
+            other.terminate()
+        if log is not None:
+            log.seek(0)
+            print('\n' + log.read().decode("utf-8", errors="replace"))
             print(f"{BRED}Something went wrong, run {BLRED}'{sys.argv[0]} --verbose'{BRED} for more info.{NC}")
         else:
             print(f'{BRED}Something went wrong. Check the log above.{NC}')
@@ -164,31 +285,127 @@ def run_command(command, meson = False, override_verbose = None, show_ouput = Fa
             print(f"{BRED}Also, running {BLRED}'{sys.argv[0]} --clean'{BRED} might fix the issue.{NC}")
         print('\033[?25h') # bring back cursor
         os._exit(1)
+    finally:
+        if log is not None:
+            log.close()
+        if show_ouput:
+            OUTPUT_LOCK.release()
+
+def install_all(conf, installers):
+    '''
+    Runs installs one after another, saving the version of each one as soon as it finishes.
+
+    Parameters:
+        conf (Config) : The Config object used to write the config file.
+        installers (list) : The InstallThread objects to run.
+    '''
+    for installer in installers:
+        installer.install()
+        # Save it now, so it isn't lost if another install fails
+        with CONFIG_LOCK:
+            installer.config[f'{installer.submodule}_version'] = installer.get_version()
+            conf.write(installer.config)
+
+def print_locked(*args):
+    '''
+    Print without getting mixed up with the output of other installs.
+
+    Parameters:
+        args (list) : Passed to print.
+    '''
+    with OUTPUT_LOCK:
+        print(*args)
+
+@functools.lru_cache(maxsize=None)
+def which(name):
+    '''
+    Find an executable in PATH, cached since PATH doesn't change while the script runs.
+
+    Parameters:
+        name (str) : The name of the executable.
+
+    Returns:
+        path (str) : The path to the executable, or None if it wasn't found.
+    '''
+    return shutil.which(name)
+
+@functools.lru_cache(maxsize=None)
+def gnome_extensions():
+    '''
+    Get the installed GNOME Shell extensions, cached so 'gnome-extensions list' only runs once.
 
-def check_output(command):
+    Returns:
+        extensions (frozenset) : The UUIDs of the installed extensions, empty if they can't be listed.
+    '''
+    try:
+        return frozenset(check_output(['gnome-extensions', 'list']).split())
+    except subprocess.CalledProcessError:
+        return frozenset()
+
+def check_output(command, cwd = None):
     '''
     Check output of command.
 
     Parameters:
         command (list) : A list of the command and arguments to run.
+        cwd (str) : The directory to run the command in. Defaults to None.
 
     Returns:
         output (str) : The ouput of the command.
     '''
-    output = subprocess.run(command, stdout=subprocess.PIPE, check=True).stdout.decode('utf-8').strip('\'\n')
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True, cwd=cwd, encoding='utf-8').stdout.strip('\'\n')
     return output
 
+def read_head(directory):
+    '''
+    Read the commit hash of HEAD in a git repo or submodule without running git.
+
+    Parameters:
+        directory (str) : The path to the repo.
+
+    Returns:
+        version (str) : 40 character commit hash, or None if it can't be read directly.
+    '''
+    git_dir = f'{directory}/.git'
+    try:
+        if os.path.isfile(git_dir): # submodules have a file pointing to the real git dir
+            with open(git_dir, encoding='UTF-8') as f:
+                git_dir = os.path.join(directory, f.read().strip().split('gitdir: ', 1)[-1])
+        with open(f'{git_dir}/HEAD', encoding='UTF-8') as f:
+            head = f.read().strip()
+        if head.startswith('ref: '):
+            with open(f'{git_dir}/{head[5:]}', encoding='UTF-8') as f:
+                head = f.read().strip()
+    except OSError: # the ref might be packed, let git handle it
+        return None
+    return head if len(head) == 40 else None
+
+@functools.lru_cache(maxsize=None)
+def submodule_versions():
+    '''
+    Get the checked out commit of every submodule with one git command, for when HEAD can't be read directly.
+
+    Returns:
+        versions (dict) : {path: 40 character commit hash}, paths are relative to the repo.
+    '''
+    versions = {}
+    for line in check_output(['git', 'submodule', 'status'], cwd=REPO_DIR).splitlines():
+        status, line = line[:1], line[1:].split()
+        if len(line) >= 2 and status != '-': # skip submodules that aren't checked out
+            versions[line[1]] = line[0]
+    return versions
+
 def main():
     '''The main function.'''
     #####################
     ##  Configuration  ##
     #####################
 
-    if shutil.which('sassc') is None:
+    if which('sassc') is None:
         print(f"{BLRED}'sassc'{BRED} not found, exiting.{NC}")
         sys.exit()
 
-    if shutil.which('git') is None:
+    if which('git') is None:
         print(f"{BLRED}'git'{BRED} not found, exiting.{NC}")
         sys.exit()
 
@@ -214,7 +431,7 @@ def main():
     # Reconfigure if config file has issues
     try:
         color_scheme = conf.theme_variants(config['theme'])
-        if not isinstance(config['enabled'], list) or color_scheme is None or len(config['enabled']) == 0:
+        if not isinstance(config['enabled'], set) or color_scheme is None or len(config['enabled']) == 0:
             configure_all = True
             conf.configure()
     except KeyError:
@@ -228,6 +445,9 @@ def main():
     if configured:
         config = conf.ret_config()
 
+    # Configuration is done, freeze it since the install threads all read it
+    config['enabled'] = frozenset(config['enabled'])
+
     conf.write(config)
 
     if configure_all or force or update_color:
@@ -272,21 +492,26 @@ def main():
                     pass
                 else:
                     exists = os.path.exists(i)
-        if should_print and exists:
-            message = ''
-            for theme in VARIANTS['enableable']:
-                if name in VARIANTS['enableable'][theme]:
-                    pretty = VARIANTS['enableable'][theme][name]
-                    if name == 'gtk4-libadwaita':
-                        message += f'{pretty} GTK4 theme{NC}'
-                    elif name == 'gtk4':
-                        message += f'{pretty} configuration{NC}'
-                    else:
-                        message += f'{pretty} theme{NC}'
-                    print(f"The {message} was installed previously, use './uninstall.py {name}' to remove it.")
+        pretty = PRETTY_NAMES.get(name)
+        if should_print and exists and pretty:
+            if name == 'gtk4-libadwaita':
+                message = f'{pretty} GTK4 theme{NC}'
+            elif name == 'gtk4':
+                message = f'{pretty} configuration{NC}'
+            else:
+                message = f'{pretty} theme{NC}'
+            print(f"The {message} was installed previously, use './uninstall.py {name}' to remove it.")
 
         return exists
 
+    # Update the submodules of every enabled theme at once, fetching in parallel
+    if not no_update:
+        submodules = [f'src/{name}' for name, parts in VARIANTS['enableable'].items() if name.startswith('dg-') and not config['enabled'].isdisjoint(parts)]
+        if len(submodules) > 0:
+            run_command(['git', 'submodule', 'update', '--init', f'--jobs={len(submodules)}'] + submodules, cwd=REPO_DIR)
+
+    installers = []
+
     # Install dg-adw-gtk3
     if 'gtk3' in config['enabled'] or 'gtk4-libadwaita' in config['enabled']:
         # If user is installing in root dir, remove old symlinks if they exist
@@ -297,9 +522,7 @@ def main():
                     if os.path.islink(directory):
                         run_command(['sudo', 'rm', '-rf', directory])
 
-        gtk3 = InstallDgAdwGtk3(config)
-        config['dg-adw-gtk3_version'] = gtk3.get_version()
-        conf.write(config)
+        installers.append(InstallDgAdwGtk3(config))
     else:
         check_path('gtk3', paths)
         check_path('gtk4', paths)
@@ -318,50 +541,54 @@ def main():
             yaru_disabled.append(i)
 
     if len(yaru_parts) > 0:
-        yaru = InstallDgYaru(config, yaru_parts, yaru_parts_pretty)
-        config['dg-yaru_version'] = yaru.get_version()
-        conf.write(config)
+        installers.append(InstallDgYaru(config, yaru_parts, yaru_parts_pretty))
     for i in yaru_disabled:
         check_path(i, paths)
 
     # Install dg-libadwaita
     if 'gtk4' in config['enabled']:
-        gtk4 = InstallDgLibadwaita(config)
-        config['dg-libadwaita_version'] = gtk4.get_version()
-        conf.write(config)
+        installers.append(InstallDgLibadwaita(config))
     else:
         check_path('gtk4', paths)
 
     # Install dg-firefox-theme
     if 'firefox' in config['enabled']:
-        firefox = InstallDgFirefoxTheme(config)
-        config['dg-firefox-theme_version'] = firefox.get_version()
-        conf.write(config)
+        installers.append(InstallDgFirefoxTheme(config))
     else:
         check_path('firefox', paths)
 
     # Install dg-vscode-adwiata
     if 'vscode' in config['enabled']:
-        vscode = InstallDgVscodeAdwaita(config)
-        config['dg-vscode-adwaita_version'] = vscode.get_version()
-        conf.write(config)
+        installers.append(InstallDgVscodeAdwaita(config))
     else:
         check_path('vscode', paths)
 
+    # Run the installs at the same time, they mostly wait on meson, ninja, and the install scripts.
+    # Verbose output from several installs would be mixed together, so don't run them at the same time then.
+    if len(installers) > 0:
+        # The meson installs have spinners and may use sudo, so run them one after another
+        meson_installers = [installer for installer in installers if installer.install_dir is not None]
+        groups = [meson_installers] if len(meson_installers) > 0 else []
+        groups += [[installer] for installer in installers if installer.install_dir is None]
+        with ThreadPoolExecutor(max_workers=1 if verbose else min(len(groups), os.cpu_count() or 1)) as executor:
+            list(executor.map(functools.partial(install_all, conf), groups))
+
     # Install snap theme
     if 'snap' in config['enabled']:
+        import socket
         try:
             # Check that there is an internet connection
-            urlopen('https://www.google.com/', timeout=3)
-            InstallQualiaGtkThemeSnap(config)
+            socket.create_connection(('1.1.1.1', 53), timeout=3).close()
+            InstallQualiaGtkThemeSnap(config).install()
         except OSError:
             pass
-    elif shutil.which('snap'):
-        snap_list = check_output(['snap', 'list'])
-        for line in snap_list:
-            line = line.split()
-            if 'qualia-gtk-theme' in line:
-                print("Snap theme was installed previously, use './uninstall.py snap' to remove it.")
+    elif which('snap'):
+        snap_list = check_output(['snap', 'list']).splitlines()[1:] # skip the header
+        if any(line.split()[:1] == ['qualia-gtk-theme'] for line in snap_list):
+            print("Snap theme was installed previously, use './uninstall.py snap' to remove it.")
+
+    # Save the installed versions
+    conf.write(config)
 
     #####################
     ##  Enable Themes  ##
@@ -373,12 +600,10 @@ def main():
     cursor_name = 'qualia'
     sourceview_name = f"qualia{config['suffix']}"
     xfwm4_name = f"qualia{config['suffix']}-{config['window-controls']}"
-    if shutil.which('xfconf-query') is not None:
+    if which('xfconf-query') is not None:
         if 'xsettings' in check_output(['xfconf-query', '-l']) and check_output(['xfconf-query', '-c', 'xsettings', '-p', '/Gdk/WindowScalingFactor']) == '2':
             xfwm4_name += '-xhdpi'
 
-    cd(REPO_DIR)
-
     kwargs = {
         'gtk3': gtk3_name,
         'icons': icon_name,
@@ -400,7 +625,7 @@ def main():
 
     # Set color scheme
     try:
-        if config['color_scheme'] is not None and shutil.which('gsettings') is not None:
+        if config['color_scheme'] is not None and which('gsettings') is not None:
             subprocess.run(['gsettings', 'set', 'org.gnome.desktop.interface', 'color-scheme', config['color_scheme']], stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, check=True)
             if config['desktop_versions']['budgie'] is not None:
                 dark = 'true' if config['color_scheme'] == 'prefer-dark' else 'false'
@@ -459,16 +684,35 @@ def main():
 
     # Symlink themes to /usr dir if using mate
     if config['desktop_versions']['mate'] is not None and config['dir'] == 'default':
+        mkdirs = set()
+        links = []
         if isinstance(theme_dirs, list):
             for directory in theme_dirs:
-                paths = glob(f'{directory}/*')
-                for target in paths:
-                    dest = '/usr' + target.split(f'{HOME}/.local')[1]
-                    directory = os.path.dirname(dest)
-                    if not os.path.isdir(directory):
-                        run_command(['sudo', 'mkdir', '-p', directory])
-                    if not os.path.exists(dest) and os.path.exists(target):
-                        run_command(['sudo', 'ln', '-rsf', target, dest])
+                try:
+                    with os.scandir(directory) as it:
+                        entries = [entry for entry in it if not entry.name.startswith('.')]
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                if len(entries) == 0:
+                    continue
+                dest_dir = '/usr' + directory.split(f'{HOME}/.local')[1]
+                if not os.path.isdir(dest_dir):
+                    mkdirs.add(dest_dir)
+                for entry in entries:
+                    dest = f'{dest_dir}/{entry.name}'
+                    if entry.is_symlink() and not os.path.exists(entry.path): # broken symlink
+                        continue
+                    if not os.path.exists(dest):
+                        links.append((entry.path, dest))
+
+        # Do everything in one sudo call instead of one per path
+        commands = ['set -e']
+        if mkdirs:
+            commands.append(shlex.join(['mkdir', '-p'] + sorted(mkdirs)))
+        for target, dest in links:
+            commands.append(shlex.join(['ln', '-rsf', target, dest]))
+        if len(commands) > 1:
+            run_command(['sudo', 'sh', '-c', '\n'.join(commands)])
 
     if updated:
         print(f"{BYELLOW}Log out and log back in for everything to be updated.{NC}")
@@ -477,6 +721,7 @@ class Config:
     '''Handles configuration of theme.'''
     def __init__(self):
         self.config = {}
+        self.written = None # contents of the config file the last time it was written
         self.config['desktop_versions'] = self.get_desktops()
         self.config['enableable'] = self.get_enableable(self.config['desktop_versions'])
 
@@ -498,34 +743,34 @@ class Config:
         '''
         desktop_versions = {}
 
-        desktop_versions['gnome'] = self.check_de_version(['gnome-shell', '--version'], r'\.[0-9]?\n?$|\D', 'gnome')
-        desktop_versions['cinnamon'] = self.check_de_version(['cinnamon', '--version'], r'\.[0-9]\.?[0-9]?[0-9]?\n?$|^Cinnamon ', 'cinnamon')
-        desktop_versions['unity'] = self.check_de_version(['unity', '--version'], r'\.[0-9]\.[0-9]?\n?$|\D', 'unity')
-        desktop_versions['mate'] = self.check_de_version(['mate-session', '--version'], r'\.[0-9][0-9]?\.[0-9][0-9]?\n?$|^mate-session ', 'mate')
-        desktop_versions['budgie'] = self.check_de_version(['budgie-desktop', '--version'], r'Copyright.*\n|\.[0-9]\n|^budgie-desktop', 'budgie')
+        # Run the version commands at the same time since they are mostly waiting on process startup
+        with ThreadPoolExecutor(max_workers=len(DE_VERSION_CHECKS)) as executor:
+            versions = executor.map(self.check_de_version, DE_VERSION_CHECKS)
+            desktop_versions.update(zip(DE_VERSION_CHECKS, versions))
 
-        if shutil.which('xfce4-session') is not None:
+        if which('xfce4-session') is not None:
             desktop_versions['xfce'] = VERSIONS['xfce'][0]
         else:
             desktop_versions['xfce'] = None
 
         return desktop_versions
 
-    def check_de_version(self, command, regex, name):
+    def check_de_version(self, name):
         '''
         Get the current version number of an installed desktop.
 
         Parameters:
-            command (list) : list that contains command and arguments to run.
-            regex (str) : regex of what to ignore in output.
-            name (str) : name of part of theme.
+            name (str) : name of desktop in DE_VERSION_CHECKS.
 
         Returns:
             enableable (int or float) : version of desktop.
         '''
+        command, regex = DE_VERSION_CHECKS[name]
+        if which(command[0]) is None: # Don't bother running it if the desktop isn't installed
+            return None
         try:
-            ver = subprocess.run(command, stdout=subprocess.PIPE).stdout.decode('utf-8')
-            ver = sub(regex, '', ver)
+            ver = subprocess.run(command, stdout=subprocess.PIPE, encoding='utf-8').stdout
+            ver = regex.sub('', ver)
 
             if '.' in ver and float(ver) in VERSIONS[name]:
                 version = float(ver)
@@ -548,14 +793,10 @@ class Config:
         Returns:
             enableable (dict) : {name: pretty_name}, themes that can be enabled.
         '''
-        enableable = {}
+        enableable = dict(PRETTY_NAMES)
 
         config = self.config
 
-        for parts in VARIANTS["enableable"].values():
-            for part, pretty_name in parts.items():
-                enableable[part] = pretty_name
-
         for i in desktop_versions:
             if desktop_versions[i] is None:
                 if i == 'gnome':
@@ -587,7 +828,7 @@ class Config:
         if len(config['vscode']) == 0:
             del enableable['vscode']
 
-        if shutil.which('snap') is None:
+        if which('snap') is None:
             del enableable['snap']
 
         return enableable
@@ -609,52 +850,79 @@ class Config:
         if configure_all or update_window_controls:
             config['window-controls'] = self.config_menu('window controls variant', VARIANTS['window-controls'])
 
-        if configure_all and shutil.which('flatpak') is not None:
+        if configure_all and which('flatpak') is not None:
             config['flatpak'] = self.config_yn('flatpak', 'Flatpak', custom_msg=FLATPAK_MSG)
 
         if configure_all:
-            config['enabled'] = []
+            config['enabled'] = set()
 
         for key, value in config['enableable'].items():
-            if key == 'settings_theme' and (update_settings or configure_all):
-                if 'firefox' in config['enabled']:
-                    if self.config_yn(key, value, custom_msg=SETTINGS_MSG):
-                        if key not in config['enabled']:
-                            config['enabled'].append(key)
-                    else:
-                        if key in config['enabled']:
-                            config['enabled'].remove(key)
-                elif update_settings:
-                    print('Firefox theme is not enabled, exiting.')
-                    sys.exit()
-                continue
-            if key == 'default_syntax' and (update_syntax or configure_all):
-                if 'vscode' in config['enabled']:
-                    if self.config_yn(key, value, 'n', custom_msg=SYNTAX_MSG):
-                        if key not in config['enabled']:
-                            config['enabled'].append(key)
-                    else:
-                        if key in config['enabled']:
-                            config['enabled'].remove(key)
-                elif update_syntax:
-                    print('VS Code theme is not enabled, exiting.')
-                    sys.exit()
-                continue
-            if configure_all:
-                if key == 'gtk4':
-                    if self.config_yn(key, value, custom_msg=GTK4_MSG):
-                        config['enabled'].append(key)
-                    continue
-                if key == 'gtk4-libadwaita':
-                    if self.config_yn(key, value, custom_msg=LIBADWAITA_MSG):
-                        config['enabled'].append(key)
-                    continue
-                if self.config_yn(key, value):
-                    config['enabled'].append(key)
+            self._CONFIGURE.get(key, Config._configure_default)(self, key, value)
 
         print() # blank line
         configured = True
 
+    def _configure_default(self, key, value):
+        '''
+        Asks whether a part of the theme should be installed.
+
+        Parameters:
+            key (str) : Name of part of theme.
+            value (str) : Name of part of theme to print.
+        '''
+        if configure_all and self.config_yn(key, value):
+            self.config['enabled'].add(key)
+
+    def _configure_gtk4(self, key, value):
+        '''Asks whether the custom GTK4 configuration should be installed.'''
+        if configure_all and self.config_yn(key, value, custom_msg=GTK4_MSG):
+            self.config['enabled'].add(key)
+
+    def _configure_libadwaita(self, key, value):
+        '''Asks whether Libadwaita should be installed as a GTK4 theme.'''
+        if configure_all and self.config_yn(key, value, custom_msg=LIBADWAITA_MSG):
+            self.config['enabled'].add(key)
+
+    def _configure_settings(self, key, value):
+        '''Asks whether the Firefox settings pages should be themed.'''
+        if update_settings or configure_all:
+            self._configure_option(key, value, 'firefox', 'y', SETTINGS_MSG, 'Firefox theme is not enabled, exiting.', update_settings)
+
+    def _configure_syntax(self, key, value):
+        '''Asks whether the default syntax highlighting should be kept in VS Code.'''
+        if update_syntax or configure_all:
+            self._configure_option(key, value, 'vscode', 'n', SYNTAX_MSG, 'VS Code theme is not enabled, exiting.', update_syntax)
+
+    def _configure_option(self, key, value, parent, default, custom_msg, exit_msg, updating):
+        '''
+        Asks about an option of a part of the theme, if that part is enabled.
+
+        Parameters:
+            key (str) : Name of the option.
+            value (str) : Name of the option to print.
+            parent (str) : Name of part of theme the option belongs to.
+            default (str) : Default answer, either 'y' or 'n'.
+            custom_msg (str) : The question to ask.
+            exit_msg (str) : Printed before exiting if the user is only changing this option and the part isn't enabled.
+            updating (bool) : True if the user is only changing this option.
+        '''
+        config = self.config
+        if parent in config['enabled']:
+            if self.config_yn(key, value, default, custom_msg=custom_msg):
+                config['enabled'].add(key)
+            else:
+                config['enabled'].discard(key)
+        elif updating:
+            print(exit_msg)
+            sys.exit()
+
+    _CONFIGURE = { # key: function used to configure it, anything else uses _configure_default
+        'settings_theme': _configure_settings,
+        'default_syntax': _configure_syntax,
+        'gtk4': _configure_gtk4,
+        'gtk4-libadwaita': _configure_libadwaita,
+    }
+
     def config_menu(self, message, options, default=1, custom_msg=None, no_columns=False):
         '''
         Prompts user with a menu of options.
@@ -673,9 +941,9 @@ class Config:
 
         print (question)
 
-        for i in range(len(options)):
-            array = list(options.keys())
-            pretty_name = list(options.values())[i]
+        array = list(options.keys())
+
+        for i, pretty_name in enumerate(options.values()):
             num = f'{i+1}:'
 
             if not no_columns and (i % 2) == 0 and i != len(array) - 1:
@@ -722,10 +990,10 @@ class Config:
 
             if val.casefold() == 'y'.casefold() or ( default == 'y' and val == '' ):
                 if name in VARIANTS['enableable']['dg-yaru'] or name in VARIANTS['enableable']['dg-adw-gtk3']:
-                    if shutil.which('meson') is None:
+                    if which('meson') is None:
                         print(f"{BLRED}'meson'{BRED} not found, can't install {pretty} theme.{NC}")
                         continue
-                    if shutil.which('ninja') is None:
+                    if which('ninja') is None:
                         print(f"{BLRED}'ninja'{BRED} not found, can't install {pretty} theme.{NC}")
                         continue
                 return True
@@ -749,80 +1017,105 @@ class Config:
                 config[theme + '_version'] = ''
 
         try:
-            config_file = open(CONFIG, encoding='UTF-8')
-            for line in config_file.readlines():
-                if ': ' in line:
-                    line = line.strip().split(': ')
+            with open(CONFIG, encoding='UTF-8') as config_file:
+                data = config_file.read()
+        except FileNotFoundError:
+            return
+
+        for line in data.splitlines():
+            key, sep, value = line.strip().partition(': ')
+            if not sep or value == '':
+                continue
+
+            if key.startswith('old') and key not in self._READERS:
+                reader = Config._read_old
+            else:
+                reader = self._READERS.get(key, Config._read_default)
+            reader(self, key, value)
+
+    def _read_list(self, key, value):
+        '''
+        Reads a space separated list of themes or variants from the config file.
+
+        Parameters:
+            key (str) : 'enabled', 'firefox', or 'vscode'.
+            value (str) : The value from the config file.
+        '''
+        if configured:
+            return
+        config = self.config
+        prefix = 'old_' if key in ('firefox', 'vscode') else ''
+        themes = []
+        seen = set()
+        for theme in value.split(' '):
+            if theme.startswith('firefox'):
+                theme = 'firefox'
+            allowed = theme in config['enableable'] or key != 'enabled'
+            if allowed and theme not in seen:
+                seen.add(theme)
+                if key == 'enabled' and theme == 'flatpak':
+                    config['flatpak'] = True
                 else:
-                    continue
+                    themes.append(theme)
+        config[prefix + key] = set(themes) if key == 'enabled' else themes
 
-                key = line[0]
+    def _read_old(self, key, value):
+        '''
+        Reads a theme that was enabled before qualia.
 
-                try:
-                    value = line[1]
-                except IndexError:
-                    continue
+        Parameters:
+            key (str) : old_{theme}_{desktop}
+            value (str) : The name of the old theme.
+        '''
+        old = key.split('_')
+        theme = old[1]
+        desktop = old[2]
+        if desktop in VERSIONS:
+            self.config['old'][theme] = {}
+            self.config['old'][theme][desktop] = value
+
+    def _read_gnome(self, key, value):
+        '''Reads the GNOME version the theme was last installed for.'''
+        try:
+            self.config['old_gnome'] = int(value)
+        except ValueError:
+            self.config['old_gnome'] = None
 
-                if ' ' in value:
-                    value = value.split(' ')
-
-                if not configured and key in ('enabled', 'firefox', 'vscode'):
-                    prefix = 'old_' if key in ('firefox', 'vscode') else ''
-                    config[prefix + key] = []
-                    if isinstance(value, list):
-                        for theme in value:
-                            if theme.startswith('firefox'):
-                                theme = 'firefox'
-                            if (theme in config['enableable'] or key != 'enabled') and theme not in config[prefix + key]:
-                                if key == 'enabled' and theme == 'flatpak':
-                                    config['flatpak'] = True
-                                else:
-                                    config[prefix + key].append(theme)
-                    elif isinstance(value, str):
-                        if value.startswith('firefox'):
-                            value = 'firefox'
-                        if (value in config['enableable'] or prefix + key != 'enabled') and value not in config[prefix + key]:
-                            config[prefix + key].append(value)
-
-                elif key.startswith('old'): # Themes that were enabled before qualia
-                    old = key.split('_')
-                    theme = old[1]
-                    desktop = old[2]
-                    if desktop in VERSIONS:
-                        config['old'][theme] = {}
-                        config['old'][theme][desktop] = value
-                elif key == 'gnome':
-                    try:
-                        config['old_gnome'] = int(value)
-                    except ValueError:
-                        config['old_gnome'] = None
-                elif key == 'flatpak':
-                    config['flatpak'] = (value == 'True')
-                elif isinstance(value, str):
-                    try:
-                        if not configured and key in VARIANTS and value in VARIANTS[key]:
-                            config[key] = value
-                        elif key.endswith('version') and len(value) == 40:
-                            config[key] = value
-                    except TypeError:
-                        continue
-            config_file.close()
-        except FileNotFoundError:
-            pass
+    def _read_flatpak(self, key, value):
+        '''Reads whether Flatpak apps were given access to the themes.'''
+        self.config['flatpak'] = (value == 'True')
+
+    def _read_default(self, key, value):
+        '''
+        Reads a variant or a submodule version from the config file.
+
+        Parameters:
+            key (str) : The name of the variant or '{theme}_version'.
+            value (str) : The value from the config file.
+        '''
+        if ' ' in value:
+            return
+        if not configured and key in VARIANTS and value in VARIANTS[key]:
+            self.config[key] = value
+        elif key.endswith('version') and len(value) == 40:
+            self.config[key] = value
+
+    _READERS = { # key: function used to read it
+        'enabled': _read_list,
+        'firefox': _read_list,
+        'vscode': _read_list,
+        'gnome': _read_gnome,
+        'flatpak': _read_flatpak,
+    }
 
     def write(self, config):
         '''
-        Writes to config file.
+        Writes to config file, only if it changed since the last write.
 
         Parameters:
             config (dict) : Dictionary that contains the configuration.
         '''
-        if os.path.isfile(CONFIG):
-            os.remove(CONFIG)
-        elif os.path.isdir(CONFIG):
-            shutil.rmtree(CONFIG)
-
-        f = open(CONFIG, 'x', encoding='UTF-8')
+        f = io.StringIO()
         f.write("This file is generated and used by the install script.\n")
         f.write("You probably shouldn't edit it.\n\n")
 
@@ -830,7 +1123,7 @@ class Config:
         f.write('theme: ' + config['theme'] + '\n')
         f.write('window-controls: ' + config['window-controls'] + '\n')
         f.write('dir: ' + config['dir'] + '\n')
-        f.write('enabled: ' + ' '.join(config['enabled']) + '\n\n')
+        f.write('enabled: ' + ' '.join(part for part in PRETTY_NAMES if part in config['enabled']) + '\n\n')
         f.write('gnome: ' + str(config['desktop_versions']['gnome']) + '\n')
         f.write('firefox: ' + ' '.join(config['firefox']) + '\n')
         f.write('vscode: ' + ' '.join(config['vscode']) + '\n')
@@ -853,7 +1146,19 @@ class Config:
                 if config['old'][theme][de] != '' and not config['old'][theme][de].startswith('qualia'):
                     f.write(f"old_{theme}_{de}: {config['old'][theme][de]}\n")
 
-        f.close()
+        filedata = f.getvalue()
+        if filedata == self.written and os.path.isfile(CONFIG):
+            return
+
+        if os.path.isdir(CONFIG):
+            shutil.rmtree(CONFIG)
+
+        # Write to a temporary file and move it over the old one so the config file always exists
+        with tempfile.NamedTemporaryFile('w', encoding='UTF-8', dir=os.path.dirname(CONFIG), delete=False) as tmp:
+            tmp.write(filedata)
+        os.chmod(tmp.name, 0o644)
+        os.replace(tmp.name, CONFIG)
+        self.written = filedata
 
     def theme_variants(self, pref):
         '''
@@ -895,26 +1200,32 @@ class Spinner(threading.Thread):
         self.theme = theme
         self.directory = directory
         self.process = process
+        self.message = f'{BGREEN}Installing{NC} the {BOLD}{theme}{NC} in {BOLD}{directory}{NC}'
+        self.message_len = len(f'Installing the {theme} in {directory}') # without the color escape codes
         self.start()
 
     def _msg(self):
         '''Prints spinner with message'''
-        message = f'{BGREEN}Installing{NC} the {BOLD}{self.theme}{NC} in {BOLD}{self.directory}{NC}'
-        message_len = len(f'Installing the {self.theme} in {self.directory}') # without the color escape codes
+        message = self.message
         if verbose:
             print(message)
-            while self.process.is_alive():
-                pass
+            self.process.join()
         else:
+            OUTPUT_LOCK.acquire() # keep the terminal until the install is done
             while self.process.is_alive():
+                columns = shutil.get_terminal_size((80, 24)).columns # refresh once per cycle in case of resize
+                # Everything but the cursor only changes when the terminal is resized
+                before = f'\r\033[?25l{message}   \033[J\033[{columns}G'
+                after = f'\n\033[{(self.message_len + 2) // columns + 1}A'
                 for cursor in '|/-\\':
-                    columns = int(os.popen('stty size', 'r').read().split()[1])
-                    sys.stdout.write(f'\r\033[?25l' + message + '   ' + f'\033[J\033[{columns}G' + cursor + '\n')
-                    sys.stdout.write(f'\033[{(message_len + 2) // (columns) + 1}A')
+                    sys.stdout.write(before + cursor + after)
                     sys.stdout.flush()
-                    time.sleep(0.1)
+                    self.process.join(timeout=0.1)
+                    if not self.process.is_alive():
+                        break
             sys.stdout.write('\r' + message + '\033[J\n\033[?25h')
             sys.stdout.flush()
+            OUTPUT_LOCK.release()
 
 class InstallThread(threading.Thread):
     '''
@@ -922,25 +1233,61 @@ class InstallThread(threading.Thread):
 
     Attributes:
         process (object) : Callable object to run in a thread.
+        src (str) : Path to the submodule being installed. Defaults to None.
     '''
-    def __init__(self, process):
-        cd(REPO_DIR)
+    submodule = None # name of the submodule, used for storing its version
+    install_dir = None # prefix that meson installs into
+
+    def __init__(self, process, src = None):
+        self.src = src
         self.spinner = None
+        self.version = None
         super().__init__(target=process)
+
+    def install(self):
+        '''
+        Runs the install and waits for it to finish.
+        '''
         self.start()
         self.join()
-        while self.spinner is not None and self.spinner.is_alive(): # Wait for spinner thread to close
-            pass
+        if self.spinner is not None: # Wait for spinner thread to close
+            self.spinner.join()
 
     def get_version(self):
         '''
-        Return current version of the submodule.
+        Return current version of the submodule, only checked once since the submodule is updated before installing.
 
         Returns:
             version (str) : 40 character commit hash
         '''
-        version = check_output(['git', 'rev-parse', 'HEAD'])
-        return version
+        if self.version is None:
+            self.version = read_head(self.src)
+        if self.version is None:
+            self.version = submodule_versions().get(os.path.relpath(self.src, REPO_DIR))
+        if self.version is None:
+            self.version = check_output(['git', 'rev-parse', 'HEAD'], cwd=self.src)
+        return self.version
+
+    def meson_install(self, options, theme, directory):
+        '''
+        Sets up the meson build dir, or reconfigures it if it already exists, then builds and installs.
+
+        Parameters:
+            options (list) : The options to pass to meson.
+            theme (str) : Name of the theme for the spinner message.
+            directory (str) : Directory the theme is installed in for the spinner message.
+        '''
+        # ninja asks for a password when installing into /usr, ask for it now before the spinner is drawn over the prompt.
+        # If this fails meson still elevates on its own, with sudo, doas, or pkexec.
+        if self.install_dir == '/usr' and which('sudo') is not None:
+            with OUTPUT_LOCK:
+                subprocess.run(['sudo', '-v'], check=False)
+        self.spinner = Spinner(theme, directory, self)
+        if os.path.isdir(f'{self.src}/build'):
+            run_command(['meson', 'configure', 'build'] + options, meson=True, cwd=self.src)
+        else:
+            run_command(['meson', 'build'] + options, meson=True, cwd=self.src)
+        run_command(['ninja', '-C', 'build', 'install'], meson=True, cwd=self.src)
 
     def updated(self):
         '''
@@ -956,17 +1303,17 @@ class InstallDgAdwGtk3(InstallThread):
     Attributes:
         config (dict) : Dictionary that contains the configuration.
     '''
+    submodule = 'dg-adw-gtk3'
+
     def __init__(self, config):
         self.config = config
-        super().__init__(process=self._install)
+        self.install_dir = f'{HOME}/.local' if config['dir'] in ('default', 'home') else '/usr'
+        super().__init__(process=self._install, src=SRC['gtk3'])
 
     def _install(self):
         config = self.config
-        if not no_update:
-            run_command(['git', 'submodule', 'update', '--init', 'src/dg-adw-gtk3'])
-        cd(SRC['gtk3'])
 
-        install_dir = f'{HOME}/.local' if config['dir'] in ('default', 'home') else '/usr'
+        install_dir = self.install_dir
 
         options = [f'-Dprefix={install_dir}']
         if 'gtk4-libadwaita' in config['enabled'] and 'gtk3' in config['enabled']:
@@ -987,16 +1334,10 @@ class InstallDgAdwGtk3(InstallThread):
         options += [f"-Daccent-colors={'' if config['color'] == 'orange' else config['color']}"]
 
         if self.get_version() != self.config['dg-adw-gtk3_version'] or reinstall or update_dir or update_window_controls:
-            self.spinner = Spinner(f"{config['color']} {pretty_string}", f'{install_dir}/share/themes', self)
-            if not os.path.isdir('build'):
-                run_command(['meson', 'build'] + options, meson=True)
-            else:
-                run_command(['meson', 'configure', 'build'] + options, meson=True)
-            run_command(['meson', 'configure', 'build'] + options, meson=True)
-            run_command(['ninja', '-C', 'build', 'install'], meson=True)
+            self.meson_install(options, f"{config['color']} {pretty_string}", f'{install_dir}/share/themes')
             self.updated()
         else:
-            print(f'The {up_to_date} up to date.')
+            print_locked(f'The {up_to_date} up to date.')
 
 class InstallDgYaru(InstallThread):
     '''
@@ -1007,40 +1348,33 @@ class InstallDgYaru(InstallThread):
         parts (list) : Parts of the theme that should be installed.
         parts_pretty (list) : Names of parts of theme to be printed.
     '''
+    submodule = 'dg-yaru'
+
     def __init__(self, config, parts, parts_pretty):
         self.config = config
         self.parts = parts
         self.parts_pretty = parts_pretty
-        super().__init__(process=self._install)
+        self.install_dir = f'{HOME}/.local' if config['dir'] == 'home' else '/usr'
+        super().__init__(process=self._install, src=SRC['yaru'])
 
     def _install(self):
         config = self.config
-        if not no_update:
-            run_command(['git', 'submodule', 'update', '--init', 'src/dg-yaru'])
-
-        cd(SRC['yaru'])
 
-        pretty_string = 'qualia '
-        for i, pretty in enumerate(self.parts_pretty):
-            if i == len(self.parts_pretty) - 1:
-                sep = ', and '
-            elif i == 0:
-                sep = ''
-            else:
-                sep = ', '
-            pretty_string += sep + pretty
-        if len(self.parts_pretty) > 1:
-            pretty_string += ' themes'
+        parts_pretty = self.parts_pretty
+        if len(parts_pretty) > 2:
+            pretty_string = ', '.join(parts_pretty[:-1]) + ', and ' + parts_pretty[-1]
         else:
-            pretty_string += ' theme'
+            pretty_string = ' and '.join(parts_pretty)
+        if len(parts_pretty) > 1:
+            pretty_string = f'qualia {pretty_string} themes'
+        else:
+            pretty_string = f'qualia {pretty_string} theme'
 
-        install_dir = f'{HOME}/.local' if config['dir'] == 'home' else '/usr'
+        install_dir = self.install_dir
 
         if self.get_version() != config['dg-yaru_version'] or reinstall or update_dir or \
         (update_window_controls and ('metacity' in config['enabled'] or 'xfwm4' in config['enabled'] or 'ubuntu-unity' in config['enabled'])) or \
         config['old_gnome'] != config['desktop_versions']['gnome']:
-            self.spinner = Spinner(f"{config['color']} {pretty_string}", f'{install_dir}/share', self)
-
             options = [f'-Dprefix={install_dir}']
 
             options += [f"-Daccent-colors={'' if config['color'] == 'orange' else config['color']}"]
@@ -1050,8 +1384,9 @@ class InstallDgYaru(InstallThread):
             for p in self.parts:
                 options.append('-D' + p + '=true')
 
+            parts = set(self.parts)
             for i in VARIANTS['enableable']['dg-yaru']:
-                if i not in self.parts:
+                if i not in parts:
                     options.append('-D' + i + '=false')
 
             if 'unity' in config['desktop_versions'] or 'mate' in config['desktop_versions']:
@@ -1063,17 +1398,13 @@ class InstallDgYaru(InstallThread):
             if gnome_version is not None:
                 options.append('-Dgnome-shell-version=' + str(gnome_version))
 
-            if not os.path.isdir('build'):
-                run_command(['meson', 'build'] + options, meson=True)
-            else:
-                run_command(['meson', 'configure', 'build'] + options, meson=True)
-            run_command(['ninja', '-C', 'build', 'install'], meson=True)
+            self.meson_install(options, f"{config['color']} {pretty_string}", f'{install_dir}/share')
             self.updated()
         else:
             if len(self.parts) > 1:
-                print(f'The {pretty_string} are up to date.')
+                print_locked(f'The {pretty_string} are up to date.')
             else:
-                print(f'The {pretty_string} is up to date.')
+                print_locked(f'The {pretty_string} is up to date.')
 
 class InstallDgLibadwaita(InstallThread):
     '''
@@ -1082,24 +1413,23 @@ class InstallDgLibadwaita(InstallThread):
     Attributes:
         config (dict) : Dictionary that contains the configuration.
     '''
+    submodule = 'dg-libadwaita'
+
     def __init__(self, config):
         self.config = config
-        super().__init__(process=self._install)
+        super().__init__(process=self._install, src=SRC['gtk4'])
 
     def _install(self):
         config = self.config
-        if not no_update:
-            run_command(['git', 'submodule', 'update', '--init', 'src/dg-libadwaita'])
-        cd(SRC['gtk4'])
 
         if self.get_version() != config['dg-libadwaita_version'] or reinstall or update_theme or update_window_controls:
             command = ['./install.sh', '-c', config['color'], '-t', config['variant']]
             if config['window-controls'] == 'symbolic':
                 command.append('-s')
-            run_command(command, show_ouput=True)
+            run_command(command, show_ouput=True, cwd=self.src)
             self.updated()
         else:
-            print('The qualia GTK4 configuration is up to date.')
+            print_locked('The qualia GTK4 configuration is up to date.')
 
 class InstallDgFirefoxTheme(InstallThread):
     '''
@@ -1108,20 +1438,16 @@ class InstallDgFirefoxTheme(InstallThread):
     Attributes:
         config (dict) : Dictionary that contains the configuration.
     '''
+    submodule = 'dg-firefox-theme'
+
     def __init__(self, config):
         self.config = config
-        super().__init__(process=self._install)
+        super().__init__(process=self._install, src=SRC['firefox'])
 
     def _install(self):
         config = self.config
-        if not no_update:
-            run_command(['git', 'submodule', 'update', '--init', 'src/dg-firefox-theme'])
-        cd(SRC['firefox'])
 
-        firefox_changed = False
-        for variant in config['firefox']:
-            if variant not in config['old_firefox']:
-                firefox_changed = True
+        firefox_changed = not set(config['firefox']).issubset(config['old_firefox'])
 
         if self.get_version() != config['dg-firefox-theme_version'] or reinstall or update_settings or firefox_changed or update_window_controls:
             command = ['./install.sh', '-c', self.config['color']]
@@ -1129,9 +1455,10 @@ class InstallDgFirefoxTheme(InstallThread):
                 command.append('-n')
             if config['window-controls'] == 'symbolic':
                 command.append('-s')
-            run_command(command, show_ouput=True)
+            run_command(command, show_ouput=True, cwd=self.src)
+            self.updated()
         else:
-            print('The qualia Firefox theme is up to date.')
+            print_locked('The qualia Firefox theme is up to date.')
 
 class InstallDgVscodeAdwaita(InstallThread):
     '''
@@ -1140,29 +1467,25 @@ class InstallDgVscodeAdwaita(InstallThread):
     Attributes:
         config (dict) : Dictionary that contains the configuration.
     '''
+    submodule = 'dg-vscode-adwaita'
+
     def __init__(self, config):
         self.config = config
-        super().__init__(process=self._install)
+        super().__init__(process=self._install, src=SRC['vscode'])
 
     def _install(self):
         config = self.config
-        if not no_update:
-            run_command(['git', 'submodule', 'update', '--init', 'src/dg-vscode-adwaita'])
-        cd(SRC['vscode'])
 
-        vscode_changed = False
-        for variant in config['vscode']:
-            if variant not in config['old_vscode']:
-                vscode_changed = True
+        vscode_changed = not set(config['vscode']).issubset(config['old_vscode'])
 
         if self.get_version() != self.config['dg-vscode-adwaita_version'] or reinstall or configure_all or update_syntax or vscode_changed or update_color:
             if 'default_syntax' in self.config['enabled']:
-                run_command(['./install.py', '-c', self.config['color'], '-t', self.config['variant'], '-d'], show_ouput = True)
+                run_command(['./install.py', '-c', self.config['color'], '-t', self.config['variant'], '-d'], show_ouput = True, cwd=self.src)
             else:
-                run_command(['./install.py', '-c', self.config['color'], '-t', self.config['variant']], show_ouput = True)
+                run_command(['./install.py', '-c', self.config['color'], '-t', self.config['variant']], show_ouput = True, cwd=self.src)
             self.updated()
         else:
-            print('The qualia VSCode theme is up to date.')
+            print_locked('The qualia VSCode theme is up to date.')
 
 class InstallQualiaGtkThemeSnap(InstallThread):
     '''
@@ -1176,32 +1499,30 @@ class InstallQualiaGtkThemeSnap(InstallThread):
         super().__init__(process=self._install)
 
     def _install(self):
-        snap_list = check_output(['snap', 'list']).split('\n')
+        snap_list = check_output(['snap', 'list']).splitlines()
+        installed_snaps = {line.split()[0] for line in snap_list[1:] if line.strip()} # skip the header
         for name in ('gtk-common-themes', 'qualia-gtk-theme'):
-            installed = False
-            for line in snap_list:
-                line = line.split()
-                if name in line:
-                    installed = True
-                    print(f'Checking if {BOLD}{name}{NC} Snap can be updated.')
-                    run_command(['sudo', 'snap', 'refresh', name], show_ouput = True)
-            if not installed:
+            if name in installed_snaps:
+                print(f'Checking if {BOLD}{name}{NC} Snap can be updated.')
+                run_command(['sudo', 'snap', 'refresh', name], show_ouput = True)
+            else:
                 print(f'{BGREEN}Installing{NC} the {BOLD}{name}{NC} Snap.')
                 run_command(['sudo', 'snap', 'install', name], show_ouput = True)
 
-        connections = check_output(['snap', 'connections']).split('\n')
-        for line in connections:
+        connections = check_output(['snap', 'connections']).splitlines()
+        plugs = {} # slot: plugs connected to it
+        for line in connections[1:]:
             line = line.split()
-            for key, value in {'gtk3': 'gtk-3', 'icons': 'icon', 'sounds': 'sound'}.items():
-                try:
-                    if key in self.config["enabled"]:
-                        if line[2] == f'gtk-common-themes:{value}-themes':
-                            run_command(['sudo', 'snap', 'connect', line[1], f'qualia-gtk-theme:{value}-themes'], show_ouput = True)
-                    else:
-                        if line[2] == f'qualia-gtk-theme:{value}-themes':
-                            run_command(['sudo', 'snap', 'disconnect', line[1], f'qualia-gtk-theme:{value}-themes'], show_ouput = True)
-                except IndexError:
-                    pass
+            if len(line) >= 3:
+                plugs.setdefault(line[2], []).append(line[1])
+
+        for key, value in {'gtk3': 'gtk-3', 'icons': 'icon', 'sounds': 'sound'}.items():
+            if key in self.config["enabled"]:
+                for plug in plugs.get(f'gtk-common-themes:{value}-themes', []):
+                    run_command(['sudo', 'snap', 'connect', plug, f'qualia-gtk-theme:{value}-themes'], show_ouput = True)
+            else:
+                for plug in plugs.get(f'qualia-gtk-theme:{value}-themes', []):
+                    run_command(['sudo', 'snap', 'disconnect', plug, f'qualia-gtk-theme:{value}-themes'], show_ouput = True)
 
 class Enable:
     '''
@@ -1213,145 +1534,15 @@ class Enable:
         kwargs (dict) : {theme: name} Dictionary of the themes to enable.
     '''
     def __init__(self, config, do_verbose, **kwargs):
-        self.names = {}
-        for theme in VARIANTS['enableable']:
-            for part in theme:
-                self.names[part] = None # default all of them to none
-        for key, value in kwargs.items():
-            self.names[key] = value
+        self.names = {part: None for part in PRETTY_NAMES} # default all of them to none
+        self.names.update(kwargs)
 
         self.config = config
         self.data = self._data()
         self.verbose = do_verbose # pass verbose as an argument because uninstall.py also uses this class
 
     def _data(self):
-        schemas = {
-            'gnome': 'org.gnome.desktop.interface',
-            'cinnamon': 'org.cinnamon.desktop.interface',
-            'unity': 'org.gnome.desktop.interface',
-            'mate': 'org.mate.interface',
-            'budgie': 'org.gnome.desktop.interface'
-        }
-
-        cursor_scemas = schemas.copy()
-        cursor_scemas['mate'] = 'org.mate.peripherals-mouse'
-
-        sound_schemas = {
-            'gnome': 'org.gnome.desktop.sound',
-            'cinnamon': 'org.cinnamon.desktop.sound',
-            'unity': 'org.gnome.desktop.sound',
-            'mate': 'org.mate.sound',
-            'budgie': 'org.gnome.desktop.sound'
-        }
-
-        gtksourceview_schemas = {
-            'Text Editor': 'org.gnome.TextEditor',
-            'Gedit': 'org.gnome.gedit.preferences.editor',
-            'Builder': 'org.gnome.builder.editor',
-            'mousepad': 'org.xfce.mousepad.preferences.view',
-            'pluma': 'org.mate.pluma'
-        }
-
-        gtksourceview_keys = {
-            'Text Editor': 'style-scheme',
-            'Gedit': 'scheme',
-            'Builder': 'style-scheme-name',
-            'mousepad': 'color-scheme',
-            'pluma': 'color-scheme'
-        }
-
-        data = {}
-        try:
-            data['gtk3'] = {
-                'schemas': schemas,
-                'key': 'gtk-theme',
-                'property': '/Net/ThemeName',
-                'theme_name': self.names['gtk3'],
-                'channel': 'xsettings'
-            }
-        except KeyError:
-            pass
-        try:
-            data['icons'] = {
-                'schemas': schemas,
-                'key': 'icon-theme',
-                'property': '/Net/IconThemeName',
-                'theme_name': self.names['icons'],
-                'channel': 'xsettings'
-            }
-        except KeyError:
-            pass
-        try:
-            data['cursors'] = {
-                'schemas': cursor_scemas,
-                'key': 'cursor-theme',
-                'property': '/Gtk/CursorThemeName',
-                'theme_name': self.names['cursors'],
-                'channel': 'xsettings'
-            }
-        except KeyError:
-            pass
-        try:
-            data['sounds'] = {
-                'schemas': sound_schemas,
-                'key': 'theme-name',
-                'property': '/Net/SoundThemeName',
-                'theme_name': self.names['sounds'],
-                'channel': 'xsettings'
-            }
-        except KeyError:
-            pass
-        try:
-            data['gnome-shell'] = {
-                'schemas': {'gnome': 'org.gnome.shell.extensions.user-theme'},
-                'key': 'name',
-                'property': None,
-                'channel': None,
-                'theme_name': self.names['gnome-shell']
-            }
-        except KeyError:
-            pass
-        try:
-            data['cinnamon-shell'] = {
-                'schemas': {'cinnamon': 'org.cinnamon.theme'},
-                'key': 'name',
-                'property': None,
-                'channel': None,
-                'theme_name': self.names['cinnamon-shell']
-            }
-        except KeyError:
-            pass
-        try:
-            data['metacity'] = {
-                'schemas': {'mate': 'org.mate.Marco.general'},
-                'key': 'theme',
-                'property': None,
-                'channel': None,
-                'theme_name': self.names['metacity']
-            }
-        except KeyError:
-            pass
-        try:
-            data['xfwm4'] = {
-                'schemas': {},
-                'key': None,
-                'property': '/general/theme',
-                'channel': 'xfwm4',
-                'theme_name': self.names['xfwm4']
-            }
-        except KeyError:
-            pass
-        try:
-            data['gtksourceview'] = {
-                'schemas': gtksourceview_schemas,
-                'key': gtksourceview_keys,
-                'property': None,
-                'channel': None,
-                'theme_name': self.names['gtksourceview']
-            }
-        except KeyError:
-            pass
-        return data
+        return {theme: {**value, 'theme_name': self.names.get(theme)} for theme, value in THEME_DATA.items()}
 
     def enable_theme(self, desktop='all', uninstalling = False):
         '''
@@ -1363,21 +1554,42 @@ class Enable:
         '''
         data = self.data
         config = self.config
-        schema_list = check_output(['gsettings', 'list-schemas'])
+        have_gsettings = which('gsettings') is not None
+        have_xfconf = which('xfconf-query') is not None
+        have_gnome_extensions = which('gnome-extensions') is not None
+        schema_list = set(check_output(['gsettings', 'list-schemas']).split()) if have_gsettings else set()
+
+        settings = {} # (schema or channel): {key or property: value}, so each one is only read once
+
+        def gsettings_get(schema, key):
+            '''Get the value of a key, reading every key in the schema the first time it is used.'''
+            if schema not in settings:
+                settings[schema] = {}
+                for line in check_output(['gsettings', 'list-recursively', schema]).splitlines():
+                    line = line.split(' ', 2)
+                    if len(line) == 3 and line[0] == schema:
+                        settings[schema][line[1]] = line[2].strip('\'')
+            return settings[schema].get(key, '')
+
+        def xfconf_get(channel, prop):
+            '''Get the value of a property, reading every property in the channel the first time it is used.'''
+            if channel not in settings:
+                settings[channel] = {}
+                for line in check_output(['xfconf-query', '-c', channel, '-l', '-v']).splitlines():
+                    line = line.split(None, 1)
+                    if len(line) == 2:
+                        settings[channel][line[0]] = line[1]
+            return settings[channel].get(prop, '')
         for theme, value in data.items():
             if theme in config['enabled'] or uninstalling:
                 if value['theme_name'] is None:
                     continue
 
                 if theme == 'gnome-shell':
-                    if shutil.which('gnome-extensions') is not None:
-                        try:
-                            if 'user-theme@gnome-shell-extensions.gcampax.github.com' in check_output(['gnome-extensions', 'list']):
-                                    run_command(['gnome-extensions', 'enable', 'user-theme@gnome-shell-extensions.gcampax.github.com'], override_verbose = self.verbose)
-                            else:
-                                print(f"{BLYELLOW}'User Themes'{BYELLOW} GNOME Shell Extension not found, not enabling GNOME Shell theme.{NC}")
-                                continue
-                        except subprocess.CalledProcessError:
+                    if have_gnome_extensions:
+                        if 'user-theme@gnome-shell-extensions.gcampax.github.com' in gnome_extensions():
+                            run_command(['gnome-extensions', 'enable', 'user-theme@gnome-shell-extensions.gcampax.github.com'], override_verbose = self.verbose)
+                        else:
                             print(f"{BLYELLOW}'User Themes'{BYELLOW} GNOME Shell Extension not found, not enabling GNOME Shell theme.{NC}")
                             continue
                     else:
@@ -1396,11 +1608,11 @@ class Enable:
                         key = value['key'][de]
                     else:
                         key = value['key']
-                    if shutil.which('gsettings') is not None:
+                    if have_gsettings:
                         if schema in schema_list:
                             if not (de in config['desktop_versions'] and config['desktop_versions'][de] is None):
                                 de_pretty = 'GNOME' if de == 'gnome' else de.capitalize()
-                                old = check_output(['gsettings', 'get', schema, key])
+                                old = gsettings_get(schema, key)
                                 if theme not in config['old']:
                                     config['old'][theme] = {}
                                     config['old'][theme][de] = old
@@ -1409,16 +1621,17 @@ class Enable:
                                 if old != name:
                                     print(f'Changing {config["enableable"][theme]} theme in {de_pretty} to {BOLD}{name}{NC}.')
                                     run_command(['gsettings', 'set', schema, key, name], override_verbose = self.verbose)
+                                    settings[schema][key] = name
                     else:
                         print(f"{BLYELLOW}'gsettings'{BYELLOW} not found, not enabling {theme} theme.{NC}")
                         break
 
                 prop = data[theme]['property']
-                if shutil.which('xfconf-query') is not None:
+                if have_xfconf:
                     name = value['theme_name']
                     channel = data[theme]['channel']
                     if prop is not None and config['desktop_versions']['xfce'] is not None:
-                        old = check_output(['xfconf-query', '-c', channel, '-p', prop])
+                        old = xfconf_get(channel, prop)
                         if theme not in config['old']:
                             config['old'][theme] = {}
                             config['old'][theme]['xfce'] = old
@@ -1427,12 +1640,15 @@ class Enable:
                         if old != name:
                             print(f'Changing {config["enableable"][theme]} theme in XFCE to {BOLD}{name}{NC}.')
                             run_command(['xfconf-query', '-c', channel, '-p', prop, '-s', name], override_verbose = self.verbose)
+                            settings[channel][prop] = name
                 elif prop is not None and config['desktop_versions']['xfce'] is not None:
                     print(f"{BLYELLOW}'xfconf-query'{BYELLOW} not found, not enabling {theme} theme.{NC}")
 
         return config
 
 if __name__ == "__main__":
+    import argparse # only needed when running this script, not when uninstall.py imports it
+
     ##############################
     ##   Command Line Options   ##
     ##############################
@@ -1522,17 +1738,8 @@ if __name__ == "__main__":
     configure_all = False
 
     if args.clean:
-        if os.getuid() != 0:
-            args = ['sudo', sys.executable] + sys.argv + [os.environ]
-            os.execlpe('sudo', *args)
-
-        for i in (SRC['yaru'], SRC['gtk3']):
-            try:
-                shutil.rmtree(f'{i}/build')
-            except NotADirectoryError:
-                os.remove(f'{i}/build')
-            except FileNotFoundError:
-                pass
+        # The build dirs can be owned by root, remove them with sudo instead of running this script again as root
+        run_command(['sudo', 'rm', '-rf', f"{SRC['yaru']}/build", f"{SRC['gtk3']}/build"])
         sys.exit()
 
     if not args.clean and os.getuid() == 0:
@@ -43,6 +43,19 @@ VSCODE_DIR = {
     'flatpak': f'{HOME}/.var/app/com.visualstudio.code/data/vscode/extensions',
 }
 
+def existing(dirs, subdir):
+    '''
+    Return the paths to a subdirectory that exist, like glob(f'{dir}*/{subdir}') without listing dir again.
+
+    Parameters:
+    dirs (list) : The directories to check.
+    subdir (str) : The name of the subdirectory.
+
+    Returns:
+        paths (list) : The paths to the subdirectory that exist.
+    '''
+    return [f'{directory}/{subdir}' for directory in dirs if path.lexists(f'{directory}/{subdir}')]
+
 def installed(old_only = False, new_only = False, just_theme_dirs = False, directory = None):
     '''
     Return paths of installed themes.
@@ -101,15 +114,17 @@ def installed(old_only = False, new_only = False, just_theme_dirs = False, direc
 
     for name in names['dg-yaru']:
         for prefix in dg_yaru_prefixes:
-            for subdir in ('themes', 'icons', 'sounds', 'gnome-shell/theme'):
+            themes = glob(f'{prefix}/themes/{name}*') # list the themes dir once and reuse it for the subdirs
+            paths['theme_dirs'] += themes
+            for subdir in ('icons', 'sounds', 'gnome-shell/theme'):
                 paths['theme_dirs'] += glob(f'{prefix}/{subdir}/{name}*')
             if just_theme_dirs:
                 continue
-            paths['gnome-shell'] += glob(f'{prefix}/themes/{name}*/gnome-shell') + glob(f'{prefix}/gnome-shell/theme/{name}*')
-            paths['metacity'] += glob(f'{prefix}/themes/{name}*/metacity')
-            paths['cinnamon-shell'] += glob(f'{prefix}/themes/{name}*/cinnamon')
-            paths['ubuntu-unity'] += glob(f'{prefix}/themes/{name}*/unity')
-            paths['xfwm4'] += glob(f'{prefix}/themes/{name}*/xfwm4')
+            paths['gnome-shell'] += existing(themes, 'gnome-shell') + glob(f'{prefix}/gnome-shell/theme/{name}*')
+            paths['metacity'] += existing(themes, 'metacity')
+            paths['cinnamon-shell'] += existing(themes, 'cinnamon')
+            paths['ubuntu-unity'] += existing(themes, 'unity')
+            paths['xfwm4'] += existing(themes, 'xfwm4')
             paths['icons'] += glob(f'{prefix}/icons/{name}*/*')
             paths['cursors'] += [f'{prefix}/icons/{name}/cursor.theme', f'{prefix}/icons/{name}/cursors']
             paths['sounds'] += [f'{prefix}/sounds/{name}']
@@ -118,10 +133,11 @@ def installed(old_only = False, new_only = False, just_theme_dirs = False, direc
 
     for name in names['dg-adw-gtk3']:
         for prefix in dg_adw_gtk3_prefixes:
-            paths['theme_dirs'] += glob(f'{prefix}/themes/{name}*')
+            themes = glob(f'{prefix}/themes/{name}*')
+            paths['theme_dirs'] += themes
             if just_theme_dirs:
                 continue
-            paths['gtk3'] += glob(f'{prefix}/themes/{name}*/gtk-3.0') + glob(f'{prefix}/themes/{name}*/gtk-2.0')
+            paths['gtk3'] += existing(themes, 'gtk-3.0') + existing(themes, 'gtk-2.0')
 
     if not just_theme_dirs:
         if directory is None:
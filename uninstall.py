@@ -147,7 +147,7 @@ def remove_theme(name, pretty, paths, old = False, disconnect = True, override_v
     if not dry_run:
         if name == 'snap' and shutil.which('snap') is not None:
             for i in snap:
-                snap_list = subprocess.run(['sudo', 'snap', 'list'], stdout=subprocess.PIPE, check=True).stdout.decode('utf-8').split('\n')
+                snap_list = subprocess.run(['sudo', 'snap', 'list'], stdout=subprocess.PIPE, encoding='utf-8', check=True).stdout.splitlines()
                 for line in snap_list:
                     line = line.split()
                     if i in line:
@@ -171,7 +171,7 @@ def remove_theme(name, pretty, paths, old = False, disconnect = True, override_v
     if disconnect and not dry_run:
         for i in snap:
             if name in ('gtk3', 'icons', 'sounds') and shutil.which('snap') is not None:
-                connections = subprocess.run(['sudo', 'snap', 'connections'], stdout=subprocess.PIPE, check=True).stdout.decode('utf-8').strip().split('\n')
+                connections = subprocess.run(['sudo', 'snap', 'connections'], stdout=subprocess.PIPE, encoding='utf-8', check=True).stdout.splitlines()
                 for line in connections:
                     line = line.split()
                     for key, value in {'gtk3': 'gtk-3', 'icons': 'icon', 'sounds': 'sound'}.items():